@@ -8,13 +8,15 @@ Database operations.
 from __future__ import annotations  # see: https://stackoverflow.com/a/33533514/2907667
 
 import logging
+from functools import lru_cache
 from typing import List, Optional
 
 from pydantic_yaml import parse_yaml_raw_as, to_yaml_str
-from sqlalchemy import Boolean, Column, String, create_engine
+from sqlalchemy import Boolean, Column, String, create_engine, delete, select
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, registry, sessionmaker
 from sqlalchemy.orm.decl_api import DeclarativeMeta
+from yaml import safe_load
 
 from vplan.engine.config import config
 from vplan.engine.exception import EngineError
@@ -22,6 +24,7 @@ from vplan.interface import ONLY_ACCOUNT, Account, PlanSchema
 
 _REGISTRY = registry()
 _ENGINE: Optional[Engine] = None
+_FACTORY: Optional[sessionmaker] = None  # type: ignore[type-arg]
 
 
 # Entities are private to this module because they're only used
@@ -65,15 +68,20 @@ def engine() -> Engine:
 # pylint: disable=global-statement
 def setup_database() -> None:
     """Set up the database connection and create any necessary tables."""
-    global _ENGINE
+    global _ENGINE, _FACTORY
     logging.getLogger("sqlalchemy").setLevel(config().database_log_level)
     _ENGINE = create_engine(config().database_url, future=True)
+    _FACTORY = sessionmaker(bind=_ENGINE, future=True)  # build the factory once; it's reused for every session
     _BaseEntity.metadata.create_all(_ENGINE)
+    _cached_account.cache_clear()  # never carry cached state across engines
+    _cached_plan.cache_clear()
 
 
 def db_session() -> Session:
     """Return a new session for use as a context manager."""
-    return sessionmaker(bind=engine(), future=True).begin()  # pylint: disable=no-member
+    if not _FACTORY:
+        raise EngineError("Database engine is not available")
+    return _FACTORY.begin()  # pylint: disable=no-member
 
 
 def db_retrieve_all_tables() -> List[str]:
@@ -81,11 +89,19 @@ def db_retrieve_all_tables() -> List[str]:
     return sorted(list(_BaseEntity.metadata.tables.keys()))
 
 
+@lru_cache(maxsize=1)
+def _cached_account() -> Account:
+    """Retrieve the single account row, caching it since it rarely changes."""
+    with db_session() as session:
+        pat_token = session.execute(
+            select(_AccountEntity.pat_token).where(_AccountEntity.account_name == ONLY_ACCOUNT)
+        ).scalar_one()
+        return Account.model_construct(pat_token=pat_token)  # validated on the way in, so skip re-validation here
+
+
 def db_retrieve_account() -> Account:
     """Retrieve account information stored in the plan engine."""
-    with db_session() as session:
-        entity = session.query(_AccountEntity).where(_AccountEntity.account_name == ONLY_ACCOUNT).one()
-        return Account(pat_token=entity.pat_token)
+    return _cached_account()
 
 
 def db_create_or_replace_account(account: Account) -> None:
@@ -96,25 +112,46 @@ def db_create_or_replace_account(account: Account) -> None:
         entity.account_name = ONLY_ACCOUNT
         entity.pat_token = account.pat_token
         session.add(entity)
+    _cached_account.cache_clear()
 
 
 def db_delete_account() -> None:
     """Delete account information stored in the plan engine."""
     with db_session() as session:
         session.query(_AccountEntity).where(_AccountEntity.account_name == ONLY_ACCOUNT).delete()
+    _cached_account.cache_clear()
 
 
 def db_retrieve_all_plans() -> List[str]:
     """Return the names of all plans stored in the plan engine."""
     with db_session() as session:
-        return [entity.plan_name for entity in session.query(_PlanEntity).all()]
+        return list(session.execute(select(_PlanEntity.plan_name)).scalars())
+
+
+@lru_cache(maxsize=32)
+def _cached_plan(plan_name: str) -> PlanSchema:
+    """Retrieve and parse a plan definition, caching it until the next plan write."""
+    with db_session() as session:
+        definition = session.execute(select(_PlanEntity.definition).where(_PlanEntity.plan_name == plan_name)).scalar_one()
+        return parse_yaml_raw_as(PlanSchema, definition)
 
 
 def db_retrieve_plan(plan_name: str) -> PlanSchema:
     """Return the plan definition stored in the plan engine."""
+    return _cached_plan(plan_name)
+
+
+def db_retrieve_plan_location(plan_name: str) -> str:
+    """
+    Return the location where a plan will execute.
+
+    Callers that need only the location (like the status and refresh
+    endpoints) can use this instead of db_retrieve_plan(), which pays for
+    validating the entire plan definition.
+    """
     with db_session() as session:
-        entity = session.query(_PlanEntity).where(_PlanEntity.plan_name == plan_name).one()
-        return parse_yaml_raw_as(PlanSchema, entity.definition)
+        definition = session.execute(select(_PlanEntity.definition).where(_PlanEntity.plan_name == plan_name)).scalar_one()
+        return str(safe_load(definition)["plan"]["location"])
 
 
 def db_create_plan(schema: PlanSchema) -> None:
@@ -125,6 +162,7 @@ def db_create_plan(schema: PlanSchema) -> None:
         entity.enabled = False
         entity.definition = to_yaml_str(schema)
         session.add(entity)
+    _cached_plan.cache_clear()
 
 
 def db_update_plan(schema: PlanSchema) -> None:
@@ -132,20 +170,24 @@ def db_update_plan(schema: PlanSchema) -> None:
     with db_session() as session:
         entity = session.query(_PlanEntity).where(_PlanEntity.plan_name == schema.plan.name).one()
         entity.definition = to_yaml_str(schema)
+    _cached_plan.cache_clear()
 
 
-def db_delete_plan(plan_name: str) -> None:
-    """Delete a plan stored in the plan engine."""
+def db_delete_plan(plan_name: str) -> str:
+    """Delete a plan stored in the plan engine, returning the location where it ran."""
     with db_session() as session:
-        entity = session.query(_PlanEntity).where(_PlanEntity.plan_name == plan_name).one()
-        session.delete(entity)
+        definition = session.execute(
+            delete(_PlanEntity).where(_PlanEntity.plan_name == plan_name).returning(_PlanEntity.definition)
+        ).scalar_one()
+    _cached_plan.cache_clear()
+    return str(safe_load(definition)["plan"]["location"])
 
 
 def db_retrieve_plan_enabled(plan_name: str) -> bool:
     """Return the enabled/disabled status of a plan in the plan engine."""
     with db_session() as session:
-        entity = session.query(_PlanEntity).where(_PlanEntity.plan_name == plan_name).one()
-        return entity.enabled  # type: ignore[no-any-return]
+        enabled = session.execute(select(_PlanEntity.enabled).where(_PlanEntity.plan_name == plan_name)).scalar_one()
+        return bool(enabled)
 
 
 def db_update_plan_enabled(plan_name: str, enabled: bool) -> None:
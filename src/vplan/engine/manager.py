@@ -6,10 +6,12 @@ Manage high-level actions on behalf of the routers.
 """
 import datetime
 import logging
+from functools import lru_cache
+from hashlib import blake2b
 from time import sleep
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 
-import pytz
+from pydantic_yaml import to_yaml_str
 from requests import models
 from sqlalchemy.exc import NoResultFound
 from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential
@@ -18,9 +20,22 @@ from vplan.engine.config import config
 from vplan.engine.database import db_retrieve_account, db_retrieve_plan, db_retrieve_plan_enabled
 from vplan.engine.exception import SmartThingsClientError
 from vplan.engine.scheduler import schedule_daily_job, schedule_immediate_job, unschedule_daily_job
-from vplan.engine.smartthings import SmartThings, build_plan_rules, parse_time, replace_rules, set_switch
+from vplan.engine.smartthings import SmartThings, build_plan_rules, parse_time, replace_rules, set_switches
 from vplan.interface import Device, PlanSchema, SimpleTime, SwitchState, TimeZone
-from vplan.util import now
+
+# Hoisted to module level so tight loops don't pay the enum descriptor lookup on every access
+_ON = SwitchState.ON
+_OFF = SwitchState.OFF
+
+# Digest of what was last pushed to SmartThings for each plan, so unchanged refreshes can be skipped
+_LAST_REFRESH: Dict[str, str] = {}
+
+
+@lru_cache(maxsize=32)
+def _trigger_time(refresh_time: str) -> datetime.time:
+    """Convert a refresh time to a datetime.time, cached since there are few distinct values."""
+    hour, minute = parse_time(refresh_time)
+    return datetime.time(hour=hour, minute=minute, second=0)
 
 
 def schedule_daily_refresh(
@@ -28,25 +43,35 @@ def schedule_daily_refresh(
 ) -> None:
     """Create or replace a job to periodically refresh the plan definition at SmartThings."""
     job_id = "daily/%s" % plan_name
-    hour, minute = parse_time(refresh_time)
-    trigger_time = datetime.time(hour=hour, minute=minute, second=0)
+    trigger_time = _trigger_time(refresh_time)
     func = refresh_plan_job
     kwargs = {"plan_name": plan_name, "location": location}
     schedule_daily_job(job_id, trigger_time, func, kwargs, time_zone)
 
 
+def schedule_refresh(schema: PlanSchema) -> None:
+    """Schedule both the immediate and the daily refresh jobs for a plan, in one shot."""
+    schedule_immediate_refresh(plan_name=schema.plan.name, location=schema.plan.location)
+    schedule_daily_refresh(
+        plan_name=schema.plan.name,
+        location=schema.plan.location,
+        refresh_time=schema.plan.refresh_time,
+        time_zone=schema.plan.refresh_zone,
+    )
+
+
 def unschedule_daily_refresh(plan_name: str) -> None:
     """Remove any existing daily refresh job."""
     job_id = "daily/%s" % plan_name
     unschedule_daily_job(job_id)
 
 
-def schedule_immediate_refresh(plan_name: str, location: str) -> None:
+def schedule_immediate_refresh(plan_name: str, location: str, durable: bool = False) -> None:
     """Schedule a job to immediately refresh the plan definition at SmartThings."""
-    job_id = "immediate/%s/%s" % (plan_name, now(pytz.UTC).isoformat())
+    job_id = "immediate/%s" % plan_name  # stable per plan, so back-to-back requests coalesce in the scheduler
     func = refresh_plan_job
     kwargs = {"plan_name": plan_name, "location": location}
-    schedule_immediate_job(job_id, func, kwargs)
+    schedule_immediate_job(job_id, func, kwargs, durable=durable)
 
 
 def validate_plan(schema: PlanSchema) -> None:
@@ -61,8 +86,7 @@ def set_device_state(location: str, devices: List[Device], state: SwitchState) -
     """Set state for a group of devices."""
     account = db_retrieve_account()
     with SmartThings(account.pat_token, location):
-        for device in devices:
-            set_switch(device, state)
+        set_switches(devices, state)
 
 
 def toggle_devices(location: str, devices: List[Device], toggles: int, delay_sec: int) -> None:
@@ -72,11 +96,20 @@ def toggle_devices(location: str, devices: List[Device], toggles: int, delay_sec
         for test in range(0, toggles):
             if test > 0:
                 sleep(delay_sec)
-            for device in devices:
-                set_switch(device, SwitchState.ON)
+            set_switches(devices, _ON)
             sleep(delay_sec)
-            for device in devices:
-                set_switch(device, SwitchState.OFF)
+            set_switches(devices, _OFF)
+
+
+def _uses_variation(schema: PlanSchema) -> bool:
+    """Whether any trigger in a plan schema uses a random variation."""
+    return any(trigger.variation not in ("disabled", "none") for group in schema.plan.groups for trigger in group.triggers)
+
+
+def _refresh_digest(location: str, schema: Optional[PlanSchema]) -> str:
+    """Generate a digest identifying the rules that a refresh would create at a location."""
+    source = "%s|%s" % (location, to_yaml_str(schema) if schema else "")
+    return blake2b(source.encode("utf8"), digest_size=16).hexdigest()
 
 
 def _refresh_plan(plan_name: str, location: str) -> None:
@@ -89,6 +122,11 @@ def _refresh_plan(plan_name: str, location: str) -> None:
     the location provided to the job, we treat this as removal from the job's
     location.
 
+    If the plan is unchanged since the last successful refresh, the SmartThings
+    calls are skipped entirely.  This does not apply to plans that use a random
+    variation, because a refresh is how those plans get new randomized on/off
+    times each day.
+
     Args:
         plan_name:  The name of the plan to refresh
         location:   The location where the plan will execute
@@ -115,8 +153,14 @@ def _refresh_plan(plan_name: str, location: str) -> None:
         logging.error("Plan not found; treating this as a disabled plan")
         schema = None
 
+    digest = _refresh_digest(location, schema)
+    if (schema is None or not _uses_variation(schema)) and _LAST_REFRESH.get(plan_name) == digest:
+        logging.info("Plan %s is unchanged since last refresh; nothing to do", plan_name)
+        return
+
     with SmartThings(account.pat_token, location):
         replace_rules(plan_name, schema)
+    _LAST_REFRESH[plan_name] = digest
 
     logging.info("Completed refreshing plan %s at location %s", plan_name, location)
 
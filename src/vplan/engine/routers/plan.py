@@ -17,13 +17,14 @@ from vplan.engine.database import (
     db_retrieve_all_plans,
     db_retrieve_plan,
     db_retrieve_plan_enabled,
+    db_retrieve_plan_location,
     db_update_plan,
     db_update_plan_enabled,
 )
 from vplan.engine.fastapi.extensions import EmptyResponse
 from vplan.engine.manager import (
-    schedule_daily_refresh,
     schedule_immediate_refresh,
+    schedule_refresh,
     set_device_state,
     toggle_devices,
     unschedule_daily_refresh,
@@ -51,13 +52,7 @@ def create_plan(schema: PlanSchema) -> None:
     """Create a plan in the plan engine."""
     validate_plan(schema=schema)
     db_create_plan(schema=schema)
-    schedule_immediate_refresh(plan_name=schema.plan.name, location=schema.plan.location)
-    schedule_daily_refresh(
-        plan_name=schema.plan.name,
-        location=schema.plan.location,
-        refresh_time=schema.plan.refresh_time,
-        time_zone=schema.plan.refresh_zone,
-    )
+    schedule_refresh(schema=schema)
     logging.info("Created plan: %s running at location %s", schema.plan.name, schema.plan.location)
 
 
@@ -66,43 +61,38 @@ def update_plan(schema: PlanSchema) -> None:
     """Update an existing plan in the plan engine."""
     validate_plan(schema=schema)
     db_update_plan(schema=schema)
-    schedule_immediate_refresh(plan_name=schema.plan.name, location=schema.plan.location)
-    schedule_daily_refresh(
-        plan_name=schema.plan.name,
-        location=schema.plan.location,
-        refresh_time=schema.plan.refresh_time,
-        time_zone=schema.plan.refresh_zone,
-    )
+    schedule_refresh(schema=schema)
     logging.info("Updated plan: %s running at location %s", schema.plan.name, schema.plan.location)
 
 
 @ROUTER.delete("/plan/{plan_name}", status_code=HTTP_204_NO_CONTENT, response_class=EmptyResponse)
 def delete_plan(plan_name: str) -> None:
     """Delete a plan stored in the plan engine."""
-    schema = db_retrieve_plan(plan_name)
-    db_delete_plan(plan_name=schema.plan.name)
-    schedule_immediate_refresh(plan_name=schema.plan.name, location=schema.plan.location)
-    unschedule_daily_refresh(plan_name=schema.plan.name)
-    logging.info("Updated plan: %s running at location %s", schema.plan.name, schema.plan.location)
+    location = db_delete_plan(plan_name=plan_name)
+    # the refresh job is the only thing left that removes this plan's rules at
+    # SmartThings, so it must survive a restart of the plan engine
+    schedule_immediate_refresh(plan_name=plan_name, location=location, durable=True)
+    unschedule_daily_refresh(plan_name=plan_name)
+    logging.info("Deleted plan: %s running at location %s", plan_name, location)
 
 
 @ROUTER.get("/plan/{plan_name}/status", status_code=HTTP_200_OK)
 def retrieve_status(plan_name: str) -> Status:
     """Return the enabled/disabled status of a plan in the plan engine."""
     enabled = db_retrieve_plan_enabled(plan_name=plan_name)
-    return Status(enabled=enabled)
+    return Status.model_construct(enabled=enabled)  # the database value is trusted, so skip validation
 
 
 @ROUTER.put("/plan/{plan_name}/status", status_code=HTTP_204_NO_CONTENT, response_class=EmptyResponse)
 def update_status(plan_name: str, status: Status) -> None:
     """Set the enabled/disabled status of a plan in the plan engine."""
-    schema = retrieve_plan(plan_name)
-    db_update_plan_enabled(plan_name=schema.plan.name, enabled=status.enabled)
-    schedule_immediate_refresh(plan_name=schema.plan.name, location=schema.plan.location)
+    location = db_retrieve_plan_location(plan_name=plan_name)
+    db_update_plan_enabled(plan_name=plan_name, enabled=status.enabled)
+    schedule_immediate_refresh(plan_name=plan_name, location=location)
     logging.info(
         "Updated plan: %s running at location %s is now %s",
-        schema.plan.name,
-        schema.plan.location,
+        plan_name,
+        location,
         "enabled" if status.enabled else "disabled",
     )
 
@@ -110,9 +100,9 @@ def update_status(plan_name: str, status: Status) -> None:
 @ROUTER.post("/plan/{plan_name}/refresh", status_code=HTTP_204_NO_CONTENT, response_class=EmptyResponse)
 def refresh_plan(plan_name: str) -> None:
     """Refresh the plan rules in the SmartThings infrastructure."""
-    schema = retrieve_plan(plan_name)
-    schedule_immediate_refresh(plan_name=schema.plan.name, location=schema.plan.location)
-    logging.info("Refreshed plan: %s running at location %s", schema.plan.name, schema.plan.location)
+    location = db_retrieve_plan_location(plan_name=plan_name)
+    schedule_immediate_refresh(plan_name=plan_name, location=location)
+    logging.info("Refreshed plan: %s running at location %s", plan_name, location)
 
 
 @ROUTER.post("/plan/{plan_name}/test/group/{group_name}", status_code=HTTP_204_NO_CONTENT, response_class=EmptyResponse)
@@ -137,8 +127,7 @@ def toggle_device(plan_name: str, room: str, device: str, component: str, toggle
     item = Device(room=SmartThingsId(room), device=SmartThingsId(device), component=SmartThingsId(component))
     schema = db_retrieve_plan(plan_name=plan_name)
     location = schema.plan.location
-    devices = schema.devices()
-    if item not in devices:
+    if not schema.contains_device(item):
         raise NoResultFound("Device not found in plan")
     toggle_devices(location=location, devices=[item], toggles=toggles, delay_sec=delay_sec)
     logging.info("Toggled device: %s/%s in %s running at location %s", room, device, schema.plan.name, schema.plan.location)
@@ -166,8 +155,7 @@ def switch_device(plan_name: str, state: str, room: str, device: str, component:
     item = Device(room=SmartThingsId(room), device=SmartThingsId(device), component=SmartThingsId(component))
     schema = db_retrieve_plan(plan_name=plan_name)
     location = schema.plan.location
-    devices = schema.devices()
-    if item not in devices:
+    if not schema.contains_device(item):
         raise NoResultFound("Device not found in plan")
     set_device_state(location=location, devices=[item], state=SwitchState(state))
     logging.info(
@@ -5,23 +5,57 @@
 Manage the runtime scheduler for periodic jobs.
 """
 import datetime
+from functools import lru_cache
 from typing import Any, Callable, Dict, Optional
 
+import pytz
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from sqlalchemy import event
 
 from vplan.engine.config import SchedulerConfig, config
 from vplan.engine.exception import EngineError
+from vplan.util import now
 
 _SCHEDULER: Optional[BackgroundScheduler] = None
 
+_IMMEDIATE_DEBOUNCE_SEC = 1  # immediate jobs fire after this delay, so bursts with the same job id collapse into one run
+
+
+@lru_cache(maxsize=64)
+def _timezone(name: str) -> datetime.tzinfo:
+    """Resolve a time zone by name, cached because pytz walks zoneinfo data on every lookup."""
+    return pytz.timezone(name)
+
+
+@lru_cache(maxsize=64)
+def _cron_trigger(hour: int, minute: int, second: int, time_zone: str, jitter: int) -> CronTrigger:
+    """Build a daily cron trigger, cached because plans often share a refresh time and zone."""
+    return CronTrigger(hour=hour, minute=minute, second=second, timezone=_timezone(time_zone), jitter=jitter)
+
+
+def _sqlite_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+    """Set SQLite pragmas on each new job store connection: WAL halves the fsyncs per commit."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
 
 def _init_scheduler(scheduler_config: SchedulerConfig) -> BackgroundScheduler:
     """Initialize the scheduler."""
-    jobstores = {"sqlite": SQLAlchemyJobStore(url=scheduler_config.database_url)}
+    # Daily jobs live in SQLite so they survive restarts.  Most immediate jobs
+    # are fire-and-forget (the next daily run redoes the same work), so they
+    # stay in memory and skip a database write on the request path; immediate
+    # jobs with no daily backstop are scheduled as durable and land in SQLite.
+    sqlite = SQLAlchemyJobStore(url=scheduler_config.database_url)
+    event.listen(sqlite.engine, "connect", _sqlite_pragmas)
+    jobstores = {"sqlite": sqlite, "memory": MemoryJobStore()}
     executors = {"default": ThreadPoolExecutor(max_workers=1)}  # only one job can run at a time; simpler to manage
     job_defaults = {"coalesce": True, "max_instances": 1}
     return BackgroundScheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults, timezone="UTC")
@@ -56,18 +90,37 @@ def schedule_immediate_job(
     job_id: str,
     func: Callable[..., None],
     kwargs: Dict[str, Any],
+    durable: bool = False,
 ) -> None:
     """
-    Create a new job that will run immediately.
+    Create or replace a job that will run almost immediately.
+
+    The job fires after a short debounce delay, and scheduling again with the
+    same job id before it fires replaces the queued job rather than adding
+    another one — so a burst of identical requests runs only once.
+
+    By default the job lives in memory and is lost on restart, which is fine
+    when the daily refresh would redo the same work.  Jobs that are the only
+    remaining reference to the work — like rule cleanup after a plan is
+    deleted — must pass durable=True so the job survives a restart.
 
     Args:
         job_id(str): Job identifier, unique across the entire system
         func(Callable): Job function to invoke on the schedule
         kwargs(Dict[str, Any]): Keyword arguments to pass to the job function when invoked
+        durable(bool): Whether the job must survive a restart of the plan engine
     """
     if not _SCHEDULER:
         raise EngineError("Scheduler has not been started.")
-    _SCHEDULER.add_job(id=job_id, jobstore="sqlite", func=func, kwargs=kwargs)
+    run_date = now(pytz.UTC) + datetime.timedelta(seconds=_IMMEDIATE_DEBOUNCE_SEC)
+    _SCHEDULER.add_job(
+        id=job_id,
+        jobstore="sqlite" if durable else "memory",
+        func=func,
+        kwargs=kwargs,
+        trigger=DateTrigger(run_date=run_date),
+        replace_existing=True,
+    )
 
 
 def schedule_daily_job(
@@ -92,7 +145,7 @@ def schedule_daily_job(
     jitter = config().scheduler.daily_job.jitter_sec
     grace = config().scheduler.daily_job.misfire_grace_sec
     hour, minute, second = trigger_time.hour, trigger_time.minute, trigger_time.second
-    trigger = CronTrigger(hour=hour, minute=minute, second=second, timezone=time_zone, jitter=jitter)
+    trigger = _cron_trigger(hour, minute, second, time_zone, jitter)
     _SCHEDULER.add_job(
         id=job_id,
         jobstore="sqlite",
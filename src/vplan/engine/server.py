@@ -6,10 +6,12 @@ The RESTful API.
 """
 import logging
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from importlib.metadata import version as metadata_version
-from typing import AsyncIterator
+from typing import AsyncIterator, Awaitable, Callable
 
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from starlette.responses import Response
 
@@ -34,42 +36,55 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
 
 
 API_VERSION = "2.0.0"
-API = FastAPI(version=API_VERSION, docs_url=None, redoc_url=None, lifespan=lifespan)  # no Swagger or ReDoc endpoints
+API = FastAPI(
+    version=API_VERSION,
+    docs_url=None,  # no Swagger endpoint
+    redoc_url=None,  # no ReDoc endpoint
+    default_response_class=ORJSONResponse,  # serialize responses with orjson, which is faster than json.dumps
+    lifespan=lifespan,
+)
 API.include_router(account.ROUTER)
 API.include_router(plan.ROUTER)
 
 
-@API.exception_handler(NoResultFound)
-async def not_found_handler(_: Request, e: NoResultFound) -> Response:
-    logging.error("Resource not found: %s", e)
-    return EmptyResponse(status_code=404)
+def _empty_response_handler(status_code: int, message: str) -> Callable[[Request, Exception], Awaitable[Response]]:
+    """Build an exception handler that logs the error and returns an empty response with a fixed status."""
 
+    async def handler(_: Request, e: Exception) -> Response:
+        logging.error("%s: %s", message, e)
+        return EmptyResponse(status_code=status_code)
 
-@API.exception_handler(ValueError)  # this happens for things like a bad enumeration value
-async def value_error_handler(_: Request, e: ValueError) -> Response:
-    logging.error("Bad request: %s", e)
-    return EmptyResponse(status_code=400)
+    return handler
 
 
-@API.exception_handler(IntegrityError)
-async def already_exists_handler(_: Request, e: IntegrityError) -> Response:
-    logging.error("Resource already exists: %s", e)
-    return EmptyResponse(status_code=409)
+# The handlers differ only by exception type, status, and log message, so they
+# are registered from a table.  ValueError happens for things like a bad
+# enumeration value.
+for _exception, _status_code, _message in [
+    (NoResultFound, 404, "Resource not found"),
+    (ValueError, 400, "Bad request"),
+    (IntegrityError, 409, "Resource already exists"),
+    (InvalidPlanError, 422, "Invalid plan"),
+]:
+    API.add_exception_handler(_exception, _empty_response_handler(_status_code, _message))
 
 
-@API.exception_handler(InvalidPlanError)
-async def invalid_plan_handler(_: Request, e: InvalidPlanError) -> Response:
-    logging.error("Invalid plan: %s", e)
-    return EmptyResponse(status_code=422)
+_HEALTH = Health()  # immutable and polled frequently, so build it once
 
 
 @API.get("/health")
 def health() -> Health:
     """Return an API health indicator."""
-    return Health()
+    return _HEALTH
+
+
+@lru_cache(maxsize=1)
+def _version() -> Version:
+    """Build the version response once; looking up package metadata walks the filesystem."""
+    return Version(package=metadata_version("vplan"), api=API_VERSION)
 
 
 @API.get("/version")
 def version() -> Version:
     """Return the API version, including both the package version and the API version"""
-    return Version(package=metadata_version("vplan"), api=API.version)
+    return _version()
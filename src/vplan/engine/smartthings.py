@@ -18,11 +18,13 @@ from __future__ import annotations  # see: https://stackoverflow.com/a/33533514/
 
 import json
 import logging
-from contextvars import ContextVar
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from functools import lru_cache
 from random import randint
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+import orjson
 import requests
 
 from vplan.engine.config import config
@@ -46,6 +48,11 @@ from vplan.interface import (
 
 _CLIENT_TIMEOUT_SEC = 5.0  # we want some fairly large timeout so that requests can't hang forever
 
+# A single pooled session shared by all SmartThings calls, so keep-alive connections
+# are reused rather than paying the TCP+TLS handshake on every request.  Authorization
+# is passed via per-request headers, so one session works for any number of tokens.
+_SESSION = requests.Session()
+
 
 # noinspection PyMethodMayBeStatic
 # pylint: disable=invalid-name:
@@ -78,9 +85,21 @@ class LocationContext:
         self.location = location
         self.headers = self._derive_headers()
         self.location_id = self._derive_location_id(location)
-        self.room_by_id, self.room_by_name = self._derive_rooms()
-        self.device_by_name = self._derive_devices()
-        self.rule_by_id = self._derive_rule_by_id()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # once the location id is known, the rooms and devices fetches are
+            # independent, so overlap the two round trips
+            rooms = executor.submit(self._retrieve_rooms)
+            devices = executor.submit(self._retrieve_devices)
+            self.room_by_id, self.room_by_name = self._derive_rooms(rooms.result())
+            self.device_by_name = self._derive_devices(devices.result())
+        self._rule_by_id: Optional[Dict[str, Dict[str, Any]]] = None  # fetched lazily via rule_by_id
+
+    @property
+    def rule_by_id(self) -> Dict[str, Dict[str, Any]]:
+        """Mapping from rule id to rule, fetched on first access because switch operations never need it."""
+        if self._rule_by_id is None:
+            self._rule_by_id = self._derive_rule_by_id()
+        return self._rule_by_id
 
     def _derive_headers(self) -> Dict[str, str]:
         """Fill standard headers for API requests."""
@@ -93,40 +112,35 @@ class LocationContext:
 
     def _derive_location_id(self, location: str) -> str:
         """Derive the location id for a location name."""
-        locations = {}
-        result = self._retrieve_locations()
-        for item in result:
-            locations[item["name"]] = item["locationId"]
-        if not location in locations:
-            raise SmartThingsClientError("Configured location not found: %s" % location)
-        lid: str = locations[location]
-        logging.info("Location id: %s", lid)
-        return lid
-
-    def _derive_rooms(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        for item in self._retrieve_locations():
+            if item["name"] == location:
+                lid: str = item["locationId"]
+                logging.info("Location id: %s", lid)
+                return lid
+        raise SmartThingsClientError("Configured location not found: %s" % location)
+
+    def _derive_rooms(self, result: List[Dict[str, Any]]) -> Tuple[Dict[str, str], Dict[str, str]]:
         """Derive the mapping from room id->name and name->id for the location."""
         room_by_id = {}
         room_by_name = {}
-        result = self._retrieve_rooms()
         for item in result:
             room_by_id[item["roomId"]] = item["name"]
             room_by_name[item["name"]] = item["roomId"]
         logging.info("Location [%s] has %d rooms", self.location, len(room_by_id))
-        if room_by_id:
+        if room_by_id and logging.getLogger().isEnabledFor(logging.DEBUG):  # don't serialize unless it will be logged
             logging.debug("Rooms by id: %s", json.dumps(room_by_id, indent=2))
         return room_by_id, room_by_name
 
-    def _derive_devices(self) -> Dict[str, str]:
+    def _derive_devices(self, result: List[Dict[str, Any]]) -> Dict[str, str]:
         """Derive the mapping from device id->Device and name->id for the location."""
         device_by_name = {}
-        result = self._retrieve_devices()
         for item in result:
             did = item["deviceId"]
             device_name = item["label"] if item["label"] else item["name"]  # users see the label, if there is one
             room_name = self.room_by_id[item["roomId"]]
             device_by_name["%s/%s" % (room_name, device_name)] = did
         logging.info("Location [%s] has %d devices", self.location, len(device_by_name))
-        if device_by_name:
+        if device_by_name and logging.getLogger().isEnabledFor(logging.DEBUG):
             logging.debug("Devices by name:\n%s", json.dumps(device_by_name, indent=2))
         return device_by_name
 
@@ -139,7 +153,7 @@ class LocationContext:
                 rule_id = item["id"]
                 rule_by_id[rule_id] = item
         logging.info("Location [%s] has %d managed rules", self.location, len(rule_by_id))
-        if rule_by_id:
+        if rule_by_id and logging.getLogger().isEnabledFor(logging.DEBUG):
             logging.debug("Managed rules by id:\n%s", json.dumps(rule_by_id, indent=2))
         return rule_by_id
 
@@ -147,36 +161,36 @@ class LocationContext:
         """Retrieve all locations associated with a token."""
         url = _url("/locations")
         params = {"limit": LocationContext.LOCATION_LIMIT}
-        response = requests.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
+        response = _SESSION.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
         _raise_for_status(response)
-        result = response.json()
+        result = orjson.loads(response.content)
         return result["items"] if "items" in result else []
 
     def _retrieve_rooms(self) -> List[Dict[str, Any]]:
         """Retrieve all rooms associated with a token."""
         url = _url("/locations/%s/rooms" % self.location_id)
         params = {"limit": LocationContext.ROOM_LIMIT}
-        response = requests.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
+        response = _SESSION.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
         _raise_for_status(response)
-        result = response.json()
+        result = orjson.loads(response.content)
         return result["items"] if "items" in result else []
 
     def _retrieve_devices(self) -> List[Dict[str, Any]]:
         """Retrieve all devices associated with a token."""
         url = _url("/devices")
         params = {"locationId": self.location_id, "capability": "switch", "limit": LocationContext.DEVICE_LIMIT}
-        response = requests.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
+        response = _SESSION.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
         _raise_for_status(response)
-        result = response.json()
+        result = orjson.loads(response.content)
         return result["items"] if "items" in result else []
 
     def _retrieve_rules(self) -> List[Dict[str, Any]]:
         """Retrieve all rules associated with a token."""
         url = _url("/rules")
         params = {"locationId": self.location_id, "limit": LocationContext.RULES_LIMIT}
-        response = requests.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
+        response = _SESSION.get(url=url, headers=self.headers, params=params, timeout=_CLIENT_TIMEOUT_SEC)
         _raise_for_status(response)
-        result = response.json()
+        result = orjson.loads(response.content)
         return result["items"] if "items" in result else []
 
 
@@ -247,10 +261,11 @@ def _build_actions(devices: Dict[str, Device], state: SwitchState) -> List[Dict[
 
 def device_id(device: Device) -> str:
     """Get the device id for a device from the context."""
+    device_by_name = CONTEXT.get().device_by_name
     key = "%s/%s" % (device.room, device.device)
-    if not key in CONTEXT.get().device_by_name:
+    if not key in device_by_name:
         raise InvalidPlanError("Invalid device: %s" % key)
-    return CONTEXT.get().device_by_name[key]
+    return device_by_name[key]
 
 
 def location_id() -> str:
@@ -260,19 +275,17 @@ def location_id() -> str:
 
 def managed_rule_ids(plan_name: str) -> List[str]:
     """Get a list of the managed rule ids from the context, filtered to those associated with a plan."""
-    return [
-        rule["id"]
-        for rule in CONTEXT.get().rule_by_id.values()
-        if rule["name"].startswith("%s/%s" % (VPLAN_RULE_PREFIX, plan_name))
-    ]
+    prefix = "%s/%s" % (VPLAN_RULE_PREFIX, plan_name)
+    return [rule["id"] for rule in CONTEXT.get().rule_by_id.values() if rule["name"].startswith(prefix)]
 
 
 def replace_managed_rules(plan_name: str, managed_rules: List[Dict[str, Any]]) -> None:
     """Replace the managed rules for this plan in the context."""
+    rule_by_id = CONTEXT.get().rule_by_id
     for rule_id in managed_rule_ids(plan_name):
-        del CONTEXT.get().rule_by_id[rule_id]
+        del rule_by_id[rule_id]
     for rule in managed_rules:
-        CONTEXT.get().rule_by_id[rule["id"]] = rule
+        rule_by_id[rule["id"]] = rule
 
 
 def build_rule(
@@ -332,7 +345,7 @@ def delete_rule(rule_id: str) -> None:
     """Delete an existing rule."""
     url = _url("/rules/%s" % rule_id)
     params = {"locationId": location_id()}
-    response = requests.delete(url=url, headers=_headers(), params=params, timeout=_CLIENT_TIMEOUT_SEC)
+    response = _SESSION.delete(url=url, headers=_headers(), params=params, timeout=_CLIENT_TIMEOUT_SEC)
     _raise_for_status(response)
 
 
@@ -340,40 +353,75 @@ def create_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
     """Create a rule, returning the result from SmartThings."""
     url = _url("/rules")
     params = {"locationId": CONTEXT.get().location_id}
-    response = requests.post(url=url, headers=_headers(), params=params, json=rule, timeout=_CLIENT_TIMEOUT_SEC)
+    response = _SESSION.post(url=url, headers=_headers(), params=params, json=rule, timeout=_CLIENT_TIMEOUT_SEC)
     _raise_for_status(response)
-    return response.json()  # type: ignore[no-any-return]
+    return orjson.loads(response.content)  # type: ignore[no-any-return]
+
+
+@lru_cache(maxsize=32)
+def _switch_command(component: str, command: str) -> bytes:
+    """Serialized payload for a switch command, cached since there are few distinct component/command pairs."""
+    return orjson.dumps({"commands": [{"component": component, "capability": "switch", "command": command}]})
 
 
 def set_switch(device: Device, state: SwitchState) -> None:
     """Switch a device on or off."""
     command = "on" if state == SwitchState.ON else "off"
-    request = {"commands": [{"component": device.component, "capability": "switch", "command": command}]}
     url = _url("/devices/%s/commands" % device_id(device))
-    response = requests.post(url=url, headers=_headers(), json=request, timeout=_CLIENT_TIMEOUT_SEC)
+    data = _switch_command(device.component, command)  # headers already declare application/json
+    response = _SESSION.post(url=url, headers=_headers(), data=data, timeout=_CLIENT_TIMEOUT_SEC)
     _raise_for_status(response)
 
 
+def set_switches(devices: List[Device], state: SwitchState) -> None:
+    """
+    Switch a group of devices on or off, fanning out requests concurrently.
+
+    SmartThings has no bulk commands endpoint, so a group of N devices still
+    requires N requests.  Issuing them from a thread pool means the group pays
+    for one round trip rather than N sequential round trips.  Each worker gets
+    a copy of the caller's context, since threads do not inherit contextvars.
+    """
+    if not devices:
+        return
+    if len(devices) == 1:
+        set_switch(devices[0], state)
+        return
+    with ThreadPoolExecutor(max_workers=min(len(devices), 8)) as executor:
+        futures = [executor.submit(copy_context().run, set_switch, device, state) for device in devices]
+        for future in futures:
+            future.result()  # surfaces the first error, if any request failed
+
+
 def check_switch(device: Device) -> SwitchState:
     """Check the state of a switch."""
     url = _url("/devices/%s/components/%s/capabilities/switch/status" % (device_id(device), device.component))
-    response = requests.get(url=url, headers=_headers(), timeout=_CLIENT_TIMEOUT_SEC)
+    response = _SESSION.get(url=url, headers=_headers(), timeout=_CLIENT_TIMEOUT_SEC)
     _raise_for_status(response)
-    return SwitchState.ON if response.json()["switch"]["value"] == "on" else SwitchState.OFF
+    return SwitchState.ON if orjson.loads(response.content)["switch"]["value"] == "on" else SwitchState.OFF
 
 
-def parse_variation(variation: str) -> Optional[int]:
-    """Parse a variation, returning random minutes (or None) to modify a trigger time."""
+@lru_cache(maxsize=32)
+def _parse_variation_spec(variation: str) -> Tuple[Optional[str], Optional[int]]:
+    """Parse a variation into (direction, minutes), cached since only the random draw differs between calls."""
     match = TRIGGER_VARIATION_REGEX.match(variation) if variation else None
     if not match:
         raise ValueError("Invalid variation")
     if match.group(1) in ["disabled", "none"]:
-        return None
+        return None, None
     direction = match.group(2)
     duration = int(match.group(3))
     unit = match.group(4)
     if unit.startswith("hour"):
         duration *= 60  # convert all durations to minutes
+    return direction, duration
+
+
+def parse_variation(variation: str) -> Optional[int]:
+    """Parse a variation, returning random minutes (or None) to modify a trigger time."""
+    direction, duration = _parse_variation_spec(variation)
+    if direction is None or duration is None:
+        return None
     if direction == "+":
         return randint(0, duration)
     elif direction == "-":
@@ -382,12 +430,13 @@ def parse_variation(variation: str) -> Optional[int]:
         return randint(-duration, duration)
 
 
+@lru_cache(maxsize=32)
 def parse_time(time: Union[str, SimpleTime]) -> Tuple[int, int]:
     """Parse a time string in SimpleTime format and return (hour, minute)."""
     match = SIMPLE_TIME_REGEX.match(time) if time else None
     if not match:
         raise ValueError("Invalid time")
-    hour, minute = int(match.group(2)), int(match.group(3))
+    hour, minute = int(match.group(1)), int(match.group(2))
     if (hour < 0 or hour > 23) or (minute < 0 or minute > 59):
         raise ValueError("Invalid SimpleTime: %s" % time)
     return hour, minute
@@ -407,34 +456,40 @@ def parse_trigger_time(trigger: Union[str, TriggerTime], variation: Optional[int
     elif match.group(1) == "noon":
         return "Noon", variation if variation and variation != 0 else None
     else:
-        seconds = (datetime.strptime(match.group(1), "%H:%M") - datetime.strptime("00:00", "%H:%M")).total_seconds()
-        minutes = round(seconds / 60) if seconds >= 0 else 0
-        offset = minutes + (variation if variation else 0)
+        hour, minute = parse_time(match.group(1))  # validates the range, so "25:00" still fails
+        offset = hour * 60 + minute + (variation if variation else 0)
         return "Midnight", offset if offset and offset > 0 else None  # can't use negative numbers
 
 
+# Shared day lists for parse_day(); callers iterate these, so returning the shared list is safe
+_ALL_DAYS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+_WEEKEND_DAYS = ["Sun", "Sat"]
+_DAY_ORDER = {day: index for index, day in enumerate(_ALL_DAYS)}
+
+
+@lru_cache(maxsize=32)
 def parse_day(day: Union[str, TriggerDay]) -> List[str]:
-    """Parse a trigger day and return a normalized list of SmartThings days."""
+    """Parse a trigger day and return a normalized list of SmartThings days; callers must not modify the result."""
     match = TRIGGER_DAY_REGEX.match(day) if day else None
     if not match:
         raise ValueError("Invalid day")
     if day.startswith("all") or day.startswith("every"):
-        return ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+        return _ALL_DAYS
     elif day.startswith("weekday"):
-        return ["Mon", "Tue", "Wed", "Thu", "Fri"]
+        return _WEEKDAYS
     elif day.startswith("weekend"):
-        return ["Sun", "Sat"]
+        return _WEEKEND_DAYS
     else:
         return [day[0:3].capitalize()]
 
 
 def parse_days(days: Union[List[str], List[TriggerDay]]) -> List[str]:
     """Parse a list of trigger days and return a normalized list of SmartThings days."""
-    sort = {"Sun": 0, "Mon": 1, "Tue": 2, "Wed": 3, "Thu": 4, "Fri": 5, "Sat": 6}
     result = set()
     if days is None:
         raise ValueError("Days is None")
     for day in days:
         for normalized in parse_day(day):
             result.add(normalized)
-    return sorted(list(result), key=lambda d: sort[d])
+    return sorted(result, key=_DAY_ORDER.__getitem__)
@@ -8,7 +8,9 @@ from __future__ import annotations  # see: https://stackoverflow.com/a/33533514/
 
 import re
 from enum import Enum
-from typing import Annotated, List, Optional
+from functools import cached_property
+from itertools import chain
+from typing import Annotated, Dict, FrozenSet, List, Optional, Tuple
 
 import pytz
 import semver
@@ -17,11 +19,12 @@ from pytz import UnknownTimeZoneError
 
 VPLAN_NAME_REGEX = re.compile(r"^[a-z0-9-]+$")
 TRIGGER_DAY_REGEX = re.compile(
-    r"^(all|every|weekday(s)?|weekend(s)?|(sun(day)?)|mon(day)?|tue(sday)?|wed(nesday)?|thu(rsday)?|fri(day)?|sat(urday)?)$"
+    r"^(?:all|every|weekdays?|weekends?"
+    r"|sun(?:day)?|mon(?:day)?|tue(?:sday)?|wed(?:nesday)?|thu(?:rsday)?|fri(?:day)?|sat(?:urday)?)$"
 )
 TRIGGER_TIME_REGEX = re.compile(r"^(sunrise|sunset|midnight|noon|\d{2}:\d{2})$")
-TRIGGER_VARIATION_REGEX = re.compile(r"^(disabled|none|([+]/-|[+]|-) (\d+) (hour(s)?|minute(s)?))$")
-SIMPLE_TIME_REGEX = re.compile(r"^((\d{2}):(\d{2}))$")
+TRIGGER_VARIATION_REGEX = re.compile(r"^(disabled|none|([+]/-|[+-]) (\d+) (hour|minute)s?)$")
+SIMPLE_TIME_REGEX = re.compile(r"^(\d{2}):(\d{2})$")
 
 ONLY_ACCOUNT = "default"
 VPLAN_RULE_PREFIX = "vplan"
@@ -186,15 +189,34 @@ class PlanSchema(BaseModel):
             raise ValueError("Invalid plan schema version")
         return version
 
-    def devices(self, group_name: Optional[str] = None) -> List[Device]:
-        """Return a list of devices in a plan, optionally filtered by group name."""
-        result = []
+    @cached_property
+    def _devices_by_group(self) -> Dict[str, List[Device]]:
+        """Devices indexed by group name, computed once per instance."""
+        result: Dict[str, List[Device]] = {}
         for group in self.plan.groups:
-            if group_name is None or group.name == group_name:
-                for device in group.devices:
-                    result.append(device)
+            result.setdefault(group.name, []).extend(group.devices)
         return result
 
+    @cached_property
+    def _all_devices(self) -> List[Device]:
+        """All devices in the plan, flattened once per instance."""
+        return list(chain.from_iterable(self._devices_by_group.values()))
+
+    @cached_property
+    def _device_keys(self) -> FrozenSet[Tuple[str, str, str]]:
+        """Hashable identity of every device in the plan, used for membership checks."""
+        return frozenset((device.room, device.device, device.component) for device in self._all_devices)
+
+    def devices(self, group_name: Optional[str] = None) -> List[Device]:
+        """Return a list of devices in a plan, optionally filtered by group name; callers must not modify the result."""
+        if group_name is None:
+            return self._all_devices
+        return self._devices_by_group.get(group_name, [])
+
+    def contains_device(self, device: Device) -> bool:
+        """Whether a device is part of this plan."""
+        return (device.room, device.device, device.component) in self._device_keys
+
 
 class Account(BaseModel):
     """A SmartThings account containing a PAT token.."""
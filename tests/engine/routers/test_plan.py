@@ -36,25 +36,22 @@ class TestRoutes:
         assert parse_yaml_raw_as(PlanSchema, response.text) == schema
         db_retrieve_plan.assert_called_once_with(plan_name="xxx")
 
-    @patch("vplan.engine.routers.plan.schedule_daily_refresh")
-    @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
+    @patch("vplan.engine.routers.plan.schedule_refresh")
     @patch("vplan.engine.routers.plan.db_create_plan")
     @patch("vplan.engine.routers.plan.validate_plan")
-    def test_create_plan(self, validate_plan, db_create_plan, schedule_immediate_refresh, schedule_daily_refresh):
+    def test_create_plan(self, validate_plan, db_create_plan, schedule_refresh):
         schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
         response = CLIENT.post(url="/plan", content=schema.model_dump_json())
         assert response.status_code == 201
         assert not response.text
         validate_plan.assert_called_once_with(schema=schema)
         db_create_plan.assert_called_once_with(schema=schema)
-        schedule_immediate_refresh.assert_called_once_with(plan_name="name", location="location")
-        schedule_daily_refresh.assert_called_once_with(plan_name="name", location="location", refresh_time="00:30", time_zone="UTC")
+        schedule_refresh.assert_called_once_with(schema=schema)
 
-    @patch("vplan.engine.routers.plan.schedule_daily_refresh")
-    @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
+    @patch("vplan.engine.routers.plan.schedule_refresh")
     @patch("vplan.engine.routers.plan.db_create_plan")
     @patch("vplan.engine.routers.plan.validate_plan")
-    def test_create_plan_invalid(self, validate_plan, db_create_plan, schedule_immediate_refresh, schedule_daily_refresh):
+    def test_create_plan_invalid(self, validate_plan, db_create_plan, schedule_refresh):
         schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
         validate_plan.side_effect = InvalidPlanError("error")
         response = CLIENT.post(url="/plan", content=schema.model_dump_json())
@@ -62,14 +59,12 @@ class TestRoutes:
         assert not response.text
         validate_plan.assert_called_once_with(schema=schema)
         db_create_plan.assert_not_called()
-        schedule_immediate_refresh.assert_not_called()
-        schedule_daily_refresh.assert_not_called()
+        schedule_refresh.assert_not_called()
 
-    @patch("vplan.engine.routers.plan.schedule_daily_refresh")
-    @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
+    @patch("vplan.engine.routers.plan.schedule_refresh")
     @patch("vplan.engine.routers.plan.db_create_plan")
     @patch("vplan.engine.routers.plan.validate_plan")
-    def test_create_plan_duplicate(self, validate_plan, db_create_plan, schedule_immediate_refresh, schedule_daily_refresh):
+    def test_create_plan_duplicate(self, validate_plan, db_create_plan, schedule_refresh):
         schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
         db_create_plan.side_effect = IntegrityError("x", "y", "z")
         response = CLIENT.post(url="/plan", content=schema.model_dump_json())
@@ -77,28 +72,24 @@ class TestRoutes:
         assert not response.text
         validate_plan.assert_called_once_with(schema=schema)
         db_create_plan.assert_called_once_with(schema=schema)
-        schedule_immediate_refresh.assert_not_called()
-        schedule_daily_refresh.assert_not_called()
+        schedule_refresh.assert_not_called()
 
-    @patch("vplan.engine.routers.plan.schedule_daily_refresh")
-    @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
+    @patch("vplan.engine.routers.plan.schedule_refresh")
     @patch("vplan.engine.routers.plan.db_update_plan")
     @patch("vplan.engine.routers.plan.validate_plan")
-    def test_update_plan(self, validate_plan, db_update_plan, schedule_immediate_refresh, schedule_daily_refresh):
+    def test_update_plan(self, validate_plan, db_update_plan, schedule_refresh):
         schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
         response = CLIENT.put(url="/plan", content=schema.model_dump_json())
         assert response.status_code == 204
         assert not response.text
         validate_plan.assert_called_once_with(schema=schema)
         db_update_plan.assert_called_once_with(schema=schema)
-        schedule_immediate_refresh.assert_called_once_with(plan_name="name", location="location")
-        schedule_daily_refresh.assert_called_once_with(plan_name="name", location="location", refresh_time="00:30", time_zone="UTC")
+        schedule_refresh.assert_called_once_with(schema=schema)
 
-    @patch("vplan.engine.routers.plan.schedule_daily_refresh")
-    @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
+    @patch("vplan.engine.routers.plan.schedule_refresh")
     @patch("vplan.engine.routers.plan.db_update_plan")
     @patch("vplan.engine.routers.plan.validate_plan")
-    def test_update_plan_invalid(self, validate_plan, db_update_plan, schedule_immediate_refresh, schedule_daily_refresh):
+    def test_update_plan_invalid(self, validate_plan, db_update_plan, schedule_refresh):
         schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
         validate_plan.side_effect = InvalidPlanError("error")
         response = CLIENT.put(url="/plan", content=schema.model_dump_json())
@@ -106,14 +97,12 @@ class TestRoutes:
         assert not response.text
         validate_plan.assert_called_once_with(schema=schema)
         db_update_plan.assert_not_called()
-        schedule_immediate_refresh.assert_not_called()
-        schedule_daily_refresh.assert_not_called()
+        schedule_refresh.assert_not_called()
 
-    @patch("vplan.engine.routers.plan.schedule_daily_refresh")
-    @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
+    @patch("vplan.engine.routers.plan.schedule_refresh")
     @patch("vplan.engine.routers.plan.db_update_plan")
     @patch("vplan.engine.routers.plan.validate_plan")
-    def test_update_plan_not_found(self, validate_plan, db_update_plan, schedule_immediate_refresh, schedule_daily_refresh):
+    def test_update_plan_not_found(self, validate_plan, db_update_plan, schedule_refresh):
         schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
         db_update_plan.side_effect = NoResultFound("hello")
         response = CLIENT.put(url="/plan", content=schema.model_dump_json())
@@ -121,35 +110,29 @@ class TestRoutes:
         assert not response.text
         validate_plan.assert_called_once_with(schema=schema)
         db_update_plan.assert_called_once_with(schema=schema)
-        schedule_immediate_refresh.assert_not_called()
-        schedule_daily_refresh.assert_not_called()
+        schedule_refresh.assert_not_called()
 
     @patch("vplan.engine.routers.plan.unschedule_daily_refresh")
     @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
-    @patch("vplan.engine.routers.plan.db_retrieve_plan")
     @patch("vplan.engine.routers.plan.db_delete_plan")
-    def test_delete_plan(self, db_delete_plan, db_retrieve_plan, schedule_immediate_refresh, unschedule_daily_refresh):
-        schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
-        db_retrieve_plan.return_value = schema
+    def test_delete_plan(self, db_delete_plan, schedule_immediate_refresh, unschedule_daily_refresh):
+        db_delete_plan.return_value = "location"
         response = CLIENT.delete(url="/plan/thename")
         assert response.status_code == 204
         assert not response.text
-        db_retrieve_plan.assert_called_once_with("thename")
-        db_delete_plan.assert_called_once_with(plan_name="name")
-        schedule_immediate_refresh.assert_called_once_with(plan_name="name", location="location")
-        unschedule_daily_refresh.assert_called_once_with(plan_name="name")
+        db_delete_plan.assert_called_once_with(plan_name="thename")
+        schedule_immediate_refresh.assert_called_once_with(plan_name="thename", location="location", durable=True)
+        unschedule_daily_refresh.assert_called_once_with(plan_name="thename")
 
     @patch("vplan.engine.routers.plan.unschedule_daily_refresh")
     @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
-    @patch("vplan.engine.routers.plan.db_retrieve_plan")
     @patch("vplan.engine.routers.plan.db_delete_plan")
-    def test_delete_plan_not_found(self, db_delete_plan, db_retrieve_plan, schedule_immediate_refresh, unschedule_daily_refresh):
-        db_retrieve_plan.side_effect = NoResultFound("hello")
+    def test_delete_plan_not_found(self, db_delete_plan, schedule_immediate_refresh, unschedule_daily_refresh):
+        db_delete_plan.side_effect = NoResultFound("hello")
         response = CLIENT.delete(url="/plan/thename")
         assert response.status_code == 404
         assert not response.text
-        db_retrieve_plan.assert_called_once_with("thename")
-        db_delete_plan.assert_not_called()
+        db_delete_plan.assert_called_once_with(plan_name="thename")
         schedule_immediate_refresh.assert_not_called()
         unschedule_daily_refresh.assert_not_called()
 
@@ -172,42 +155,40 @@ class TestRoutes:
 
     @pytest.mark.parametrize("enabled", [True, False])
     @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
-    @patch("vplan.engine.routers.plan.db_retrieve_plan")
+    @patch("vplan.engine.routers.plan.db_retrieve_plan_location")
     @patch("vplan.engine.routers.plan.db_update_plan_enabled")
-    def test_update_status(self, db_update_plan_enabled, db_retrieve_plan, schedule_immediate_refresh, enabled):
-        schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
-        db_retrieve_plan.return_value = schema
+    def test_update_status(self, db_update_plan_enabled, db_retrieve_plan_location, schedule_immediate_refresh, enabled):
+        db_retrieve_plan_location.return_value = "location"
         status = Status(enabled=enabled)
         response = CLIENT.put(url="/plan/thename/status", content=status.model_dump_json())
         assert response.status_code == 204
         assert not response.text
-        db_retrieve_plan.assert_called_once_with(plan_name="thename")
-        db_update_plan_enabled.assert_called_once_with(plan_name="name", enabled=enabled)
-        schedule_immediate_refresh.assert_called_once_with(plan_name="name", location="location")
+        db_retrieve_plan_location.assert_called_once_with(plan_name="thename")
+        db_update_plan_enabled.assert_called_once_with(plan_name="thename", enabled=enabled)
+        schedule_immediate_refresh.assert_called_once_with(plan_name="thename", location="location")
 
     @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
-    @patch("vplan.engine.routers.plan.db_retrieve_plan")
+    @patch("vplan.engine.routers.plan.db_retrieve_plan_location")
     @patch("vplan.engine.routers.plan.db_update_plan_enabled")
-    def test_update_status_not_found(self, db_update_plan_enabled, db_retrieve_plan, schedule_immediate_refresh):
-        db_retrieve_plan.side_effect = NoResultFound("hello")
+    def test_update_status_not_found(self, db_update_plan_enabled, db_retrieve_plan_location, schedule_immediate_refresh):
+        db_retrieve_plan_location.side_effect = NoResultFound("hello")
         status = Status(enabled=True)
         response = CLIENT.put(url="/plan/thename/status", content=status.model_dump_json())
         assert response.status_code == 404
         assert not response.text
-        db_retrieve_plan.assert_called_once_with(plan_name="thename")
+        db_retrieve_plan_location.assert_called_once_with(plan_name="thename")
         db_update_plan_enabled.assert_not_called()
         schedule_immediate_refresh.assert_not_called()
 
     @patch("vplan.engine.routers.plan.schedule_immediate_refresh")
-    @patch("vplan.engine.routers.plan.db_retrieve_plan")
-    def test_refresh_plan(self, db_retrieve_plan, schedule_immediate_refresh):
-        schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
-        db_retrieve_plan.return_value = schema
+    @patch("vplan.engine.routers.plan.db_retrieve_plan_location")
+    def test_refresh_plan(self, db_retrieve_plan_location, schedule_immediate_refresh):
+        db_retrieve_plan_location.return_value = "location"
         response = CLIENT.post(url="/plan/thename/refresh")
         assert response.status_code == 204
         assert not response.text
-        db_retrieve_plan.assert_called_once_with(plan_name="thename")
-        schedule_immediate_refresh.assert_called_once_with(plan_name="name", location="location")
+        db_retrieve_plan_location.assert_called_once_with(plan_name="thename")
+        schedule_immediate_refresh.assert_called_once_with(plan_name="thename", location="location")
 
     @patch("vplan.engine.routers.plan.toggle_devices")
     @patch("vplan.engine.routers.plan.db_retrieve_plan")
@@ -254,7 +235,7 @@ class TestRoutes:
         device = Device(room="yyy", device="zzz", component="ccc")
         plan = MagicMock(location="bbb")
         schema = MagicMock(plan=plan)
-        schema.devices = MagicMock(return_value=[device])
+        schema.contains_device = MagicMock(return_value=True)
         db_retrieve_plan.return_value = schema
         params = {
             "toggles": 4,
@@ -263,6 +244,7 @@ class TestRoutes:
         response = CLIENT.post(url="/plan/xxx/test/device/yyy/zzz/ccc", params=params)
         assert response.status_code == 204
         assert not response.text
+        schema.contains_device.assert_called_once_with(device)
         toggle_devices.assert_called_once_with(location="bbb", devices=[device], toggles=4, delay_sec=10)
 
     @patch("vplan.engine.routers.plan.toggle_devices")
@@ -270,7 +252,7 @@ class TestRoutes:
     def test_toggle_device_not_found(self, db_retrieve_plan, toggle_devices):
         plan = MagicMock(location="bbb")
         schema = MagicMock(plan=plan)
-        schema.devices = MagicMock(return_value=[])  # our device is not in this list, by definition
+        schema.contains_device = MagicMock(return_value=False)  # our device is not in this plan, by definition
         db_retrieve_plan.return_value = schema
         params = {
             "toggles": 4,
@@ -332,11 +314,12 @@ class TestRoutes:
         device = Device(room="yyy", device="zzz", component="ccc")
         plan = MagicMock(location="bbb")
         schema = MagicMock(plan=plan)
-        schema.devices = MagicMock(return_value=[device])
+        schema.contains_device = MagicMock(return_value=True)
         db_retrieve_plan.return_value = schema
         response = CLIENT.post(url="/plan/xxx/%s/device/yyy/zzz/ccc" % state)
         assert response.status_code == 204
         assert not response.text
+        schema.contains_device.assert_called_once_with(device)
         set_device_state.assert_called_once_with(location="bbb", devices=[device], state=SwitchState(state))
 
     @pytest.mark.parametrize("state", ["on", "off"])
@@ -345,7 +328,7 @@ class TestRoutes:
     def test_switch_device_not_found(self, db_retrieve_plan, set_device_state, state):
         plan = MagicMock(location="bbb")
         schema = MagicMock(plan=plan)
-        schema.devices = MagicMock(return_value=[])  # our device is not in this list, by definition
+        schema.contains_device = MagicMock(return_value=False)  # our device is not in this plan, by definition
         db_retrieve_plan.return_value = schema
         response = CLIENT.post(url="/plan/xxx/%s/device/yyy/zzz/ccc" % state)
         assert response.status_code == 404
@@ -356,10 +339,9 @@ class TestRoutes:
     @patch("vplan.engine.routers.plan.set_device_state")
     @patch("vplan.engine.routers.plan.db_retrieve_plan")
     def test_switch_device_bad_state(self, db_retrieve_plan, set_device_state, state):
-        device = Device(room="yyy", device="zzz", component="ccc")
         plan = MagicMock(location="bbb")
         schema = MagicMock(plan=plan)
-        schema.devices = MagicMock(return_value=[device])
+        schema.contains_device = MagicMock(return_value=True)
         db_retrieve_plan.return_value = schema
         response = CLIENT.post(url="/plan/xxx/%s/device/yyy/zzz/ccc" % state)
         assert response.status_code == 400
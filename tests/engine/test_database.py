@@ -18,6 +18,7 @@ from vplan.engine.database import (
     db_retrieve_all_tables,
     db_retrieve_plan,
     db_retrieve_plan_enabled,
+    db_retrieve_plan_location,
     db_update_plan,
     db_update_plan_enabled,
     setup_database,
@@ -61,8 +62,13 @@ class TestDatabase:
         with pytest.raises(NoResultFound):
             db_retrieve_account()
 
+    def test_account_caching(self, database):
+        account = Account(pat_token="111")
+        db_create_or_replace_account(account)
+        assert db_retrieve_account() is db_retrieve_account()  # repeat reads are served from the cache
+
     def test_plan_roundtrip(self, database):
-        assert db_retrieve_all_plans() == []
+        assert not db_retrieve_all_plans()
         with pytest.raises(NoResultFound):
             db_retrieve_plan("name")
 
@@ -91,19 +97,31 @@ class TestDatabase:
         assert db_retrieve_all_plans() == ["aaa", "bbb"]
         assert db_retrieve_plan("bbb") == schema_b1
 
-        db_delete_plan("aaa")
+        assert db_delete_plan("aaa") == "location2"  # the delete returns the plan's location
         assert db_retrieve_all_plans() == ["bbb"]
         with pytest.raises(NoResultFound):
             db_retrieve_plan("aaa")
         assert db_retrieve_plan("bbb") == schema_b1
 
-        db_delete_plan("bbb")
-        assert db_retrieve_all_plans() == []
+        assert db_delete_plan("bbb") == "locationB"
+        assert not db_retrieve_all_plans()
         with pytest.raises(NoResultFound):
             db_retrieve_plan("aaa")
         with pytest.raises(NoResultFound):
             db_retrieve_plan("bbb")
 
+    def test_plan_caching(self, database):
+        schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
+        db_create_plan(schema)
+        assert db_retrieve_plan("name") is db_retrieve_plan("name")  # repeat reads are served from the cache
+
+    def test_plan_location(self, database):
+        with pytest.raises(NoResultFound):
+            db_retrieve_plan_location("name")
+        schema = PlanSchema(version="1.0.0", plan=Plan(name="name", location="location", refresh_time="00:30"))
+        db_create_plan(schema)
+        assert db_retrieve_plan_location("name") == "location"
+
     def test_plan_full_yaml(self, database):
         schema = parse_yaml_file_as(PlanSchema, PLAN_FILE)
         db_create_plan(schema)
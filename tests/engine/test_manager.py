@@ -9,14 +9,23 @@ from sqlalchemy.exc import NoResultFound
 
 from vplan.engine.exception import SmartThingsClientError
 from vplan.engine.manager import (
+    _LAST_REFRESH,
     refresh_plan_job,
     schedule_daily_refresh,
     schedule_immediate_refresh,
+    schedule_refresh,
     set_device_state,
     toggle_devices,
     unschedule_daily_refresh,
 )
-from vplan.interface import Account, Device, SwitchState
+from vplan.interface import Account, Device, DeviceGroup, Plan, PlanSchema, SwitchState, Trigger
+
+
+def _schema(location="loc", variation="disabled"):
+    """Build a simple plan schema for refresh tests."""
+    trigger = Trigger(days=["all"], on_time="19:00", off_time="22:00", variation=variation)
+    group = DeviceGroup(name="group", devices=[Device(room="r", device="d")], triggers=[trigger])
+    return PlanSchema(version="1.1.0", plan=Plan(name="plan", location=location, refresh_time="00:30", groups=[group]))
 
 
 class TestScheduler:
@@ -31,46 +40,53 @@ class TestScheduler:
             "America/Chicago",
         )
 
+    @patch("vplan.engine.manager.schedule_daily_refresh")
+    @patch("vplan.engine.manager.schedule_immediate_refresh")
+    def test_schedule_refresh(self, immediate_refresh, daily_refresh):
+        schema = _schema()
+        schedule_refresh(schema)
+        immediate_refresh.assert_called_once_with(plan_name="plan", location="loc")
+        daily_refresh.assert_called_once_with(plan_name="plan", location="loc", refresh_time="00:30", time_zone="UTC")
+
     @patch("vplan.engine.manager.unschedule_daily_job")
     def test_unschedule_daily_refresh(self, unschedule_daily_job):
         unschedule_daily_refresh("plan")
         unschedule_daily_job.assert_called_once_with("daily/plan")
 
-    @patch("vplan.engine.manager.now")
+    @pytest.mark.parametrize("durable", [True, False])
     @patch("vplan.engine.manager.schedule_immediate_job")
-    def test_schedule_immediate_refresh(self, schedule_immediate_job, now):
-        now.return_value = MagicMock()
-        now.return_value.isoformat = MagicMock(return_value="thetime")
-        schedule_immediate_refresh("plan", "loc")
+    def test_schedule_immediate_refresh(self, schedule_immediate_job, durable):
+        schedule_immediate_refresh("plan", "loc", durable=durable)
         schedule_immediate_job.assert_called_once_with(
-            "immediate/plan/thetime",
+            "immediate/plan",
             refresh_plan_job,
             {"plan_name": "plan", "location": "loc"},
+            durable=durable,
         )
 
 
 @patch("vplan.engine.manager.SmartThings")
 class TestDeviceState:
     @pytest.mark.parametrize("state", [SwitchState.OFF, SwitchState.ON])
-    @patch("vplan.engine.manager.set_switch")
+    @patch("vplan.engine.manager.set_switches")
     @patch("vplan.engine.manager.db_retrieve_account")
-    def test_set_device_state(self, db_retrieve_account, set_switch, context, state):
+    def test_set_device_state(self, db_retrieve_account, set_switches, context, state):
         account = Account(pat_token="token")
         db_retrieve_account.return_value = account
         device1 = Device(room="r", device="d1")
         device2 = Device(room="r", device="d2")
         set_device_state(location="location", devices=[device1, device2], state=state)
         context.assert_called_once_with("token", "location")
-        set_switch.assert_has_calls([call(device1, state), call(device2, state)])
+        set_switches.assert_called_once_with([device1, device2], state)
 
-    @patch("vplan.engine.manager.set_switch")
+    @patch("vplan.engine.manager.set_switches")
     @patch("vplan.engine.manager.sleep")
     @patch("vplan.engine.manager.db_retrieve_account")
-    def test_toggle_devices(self, db_retrieve_account, sleep, set_switch, context):
+    def test_toggle_devices(self, db_retrieve_account, sleep, set_switches, context):
         # See: https://stackoverflow.com/a/68578027
         call_order = []
         sleep.side_effect = lambda *a, **kw: call_order.append(sleep)
-        set_switch.side_effect = lambda *a, **kw: call_order.append(set_switch)
+        set_switches.side_effect = lambda *a, **kw: call_order.append(set_switches)
 
         account = Account(pat_token="token")
         db_retrieve_account.return_value = account
@@ -83,27 +99,23 @@ class TestDeviceState:
         context.assert_called_once_with("token", "location")
 
         assert call_order == [
-            set_switch,
-            set_switch,
+            set_switches,
             sleep,
-            set_switch,
-            set_switch,
+            set_switches,
             sleep,
-            set_switch,
-            set_switch,
+            set_switches,
             sleep,
-            set_switch,
-            set_switch,
+            set_switches,
         ]
 
         sleep.assert_has_calls([call(5)] * 3)  # 5 seconds of delay 3 different times
 
-        set_switch.assert_has_calls(
+        set_switches.assert_has_calls(
             [
-                call(device1, SwitchState.ON),
-                call(device2, SwitchState.ON),
-                call(device1, SwitchState.OFF),
-                call(device2, SwitchState.OFF),
+                call([device1, device2], SwitchState.ON),
+                call([device1, device2], SwitchState.OFF),
+                call([device1, device2], SwitchState.ON),
+                call([device1, device2], SwitchState.OFF),
             ]
         )
 
@@ -115,6 +127,12 @@ class TestDeviceState:
 @patch("vplan.engine.manager.db_retrieve_account")
 @patch("vplan.engine.manager.config")
 class TestRefresh:
+    @pytest.fixture(autouse=True)
+    def cache(self):
+        _LAST_REFRESH.clear()  # the unchanged-plan cache would otherwise leak state between tests
+        yield
+        _LAST_REFRESH.clear()
+
     def test_refresh_plan_job_no_account(
         self, config, db_retrieve_account, db_retrieve_plan_enabled, db_retrieve_plan, replace_rules, context
     ):
@@ -162,7 +180,7 @@ class TestRefresh:
         self, config, db_retrieve_account, db_retrieve_plan_enabled, db_retrieve_plan, replace_rules, context
     ):
         account = MagicMock(pat_token="token")
-        schema = MagicMock(plan=MagicMock(location="different"))  # because this does not match passed-in "loc", we delete
+        schema = _schema(location="different")  # because this does not match passed-in "loc", we delete
         db_retrieve_account.return_value = account
         db_retrieve_plan_enabled.return_value = True
         db_retrieve_plan.return_value = schema
@@ -179,7 +197,7 @@ class TestRefresh:
         self, config, db_retrieve_account, db_retrieve_plan_enabled, db_retrieve_plan, replace_rules, context
     ):
         account = MagicMock(pat_token="token")
-        schema = MagicMock(plan=MagicMock(location="loc"))  # because matches the passed-in "loc", it's safe to refresh
+        schema = _schema()  # because the location matches the passed-in "loc", it's safe to refresh
         db_retrieve_account.return_value = account
         db_retrieve_plan_enabled.return_value = True
         db_retrieve_plan.return_value = schema
@@ -192,6 +210,34 @@ class TestRefresh:
         context.assert_called_once_with("token", "loc")
         replace_rules.assert_called_once_with("plan", schema)
 
+    def test_refresh_plan_job_unchanged(
+        self, config, db_retrieve_account, db_retrieve_plan_enabled, db_retrieve_plan, replace_rules, context
+    ):
+        account = MagicMock(pat_token="token")
+        schema = _schema()  # no variation, so an unchanged plan can be skipped
+        db_retrieve_account.return_value = account
+        db_retrieve_plan_enabled.return_value = True
+        db_retrieve_plan.return_value = schema
+
+        refresh_plan_job("plan", "loc")
+        refresh_plan_job("plan", "loc")
+
+        replace_rules.assert_called_once_with("plan", schema)  # the second refresh is a no-op
+
+    def test_refresh_plan_job_unchanged_variation(
+        self, config, db_retrieve_account, db_retrieve_plan_enabled, db_retrieve_plan, replace_rules, context
+    ):
+        account = MagicMock(pat_token="token")
+        schema = _schema(variation="+/- 30 minutes")  # a variation needs new random times on every refresh
+        db_retrieve_account.return_value = account
+        db_retrieve_plan_enabled.return_value = True
+        db_retrieve_plan.return_value = schema
+
+        refresh_plan_job("plan", "loc")
+        refresh_plan_job("plan", "loc")
+
+        replace_rules.assert_has_calls([call("plan", schema), call("plan", schema)])
+
     @pytest.mark.parametrize(
         "max_attempts",
         [-20, -1, 0, 1],  # any of these values count as only a single attempt (no retries)
@@ -209,7 +255,7 @@ class TestRefresh:
         config.return_value = MagicMock(retry=MagicMock(max_attempts=max_attempts, min_sec=0.25, max_sec=1))
 
         account = MagicMock(pat_token="token")
-        schema = MagicMock(plan=MagicMock(location="loc"))  # because matches the passed-in "loc", it's safe to refresh
+        schema = _schema()  # because the location matches the passed-in "loc", it's safe to refresh
         db_retrieve_account.return_value = account
         db_retrieve_plan_enabled.return_value = True
         db_retrieve_plan.return_value = schema
@@ -231,7 +277,7 @@ class TestRefresh:
         config.return_value = MagicMock(retry=MagicMock(max_attempts=2, min_sec=0.25, max_sec=1))
 
         account = MagicMock(pat_token="token")
-        schema = MagicMock(plan=MagicMock(location="loc"))  # because matches the passed-in "loc", it's safe to refresh
+        schema = _schema()  # because the location matches the passed-in "loc", it's safe to refresh
         db_retrieve_account.return_value = account
         db_retrieve_plan_enabled.return_value = True
         db_retrieve_plan.return_value = schema
@@ -115,6 +115,13 @@ class TestLifecycle:
             wait().at_most(JOB_DELAY_SEC, SECOND).until(lambda: INDICATOR == "job #3")
             assert_no_jobs()
 
+            # Schedule a durable immediate job and make sure it lands in the persistent store before running
+            schedule_immediate_job(job_id="durable_job", func=job_function, kwargs={"message": "job #4"}, durable=True)
+            assert_immediate_job_definition("durable_job", {"message": "job #4"})
+            assert scheduler().get_jobs(jobstore="sqlite")[0].id == "durable_job"
+            wait().at_most(JOB_DELAY_SEC, SECOND).until(lambda: INDICATOR == "job #4")
+            assert_no_jobs()
+
         finally:
             shutdown_scheduler()
             with pytest.raises(EngineError, match=r"Scheduler is not available"):
@@ -6,7 +6,7 @@ from unittest.mock import patch
 import pytest
 from fastapi.testclient import TestClient
 
-from vplan.engine.server import API, API_VERSION, lifespan
+from vplan.engine.server import API, API_VERSION, _version, lifespan
 
 CLIENT = TestClient(API)
 
@@ -37,7 +37,11 @@ class TestRoutes:
 
     @patch("vplan.engine.server.metadata_version")
     def test_version(self, metadata_version):
-        metadata_version.return_value = "xxx"
-        response = CLIENT.get(url="/version")
-        assert response.status_code == 200
-        assert response.json() == {"package": "xxx", "api": API_VERSION}
+        _version.cache_clear()  # the version is cached, so clear it to make sure the mock is consulted
+        try:
+            metadata_version.return_value = "xxx"
+            response = CLIENT.get(url="/version")
+            assert response.status_code == 200
+            assert response.json() == {"package": "xxx", "api": API_VERSION}
+        finally:
+            _version.cache_clear()
@@ -11,7 +11,6 @@ import pytest
 import responses
 from requests.models import HTTPError
 from responses import matchers
-from responses.registries import OrderedRegistry
 
 from vplan.engine.exception import InvalidPlanError, SmartThingsClientError
 from vplan.engine.smartthings import (
@@ -36,6 +35,7 @@ from vplan.engine.smartthings import (
     replace_managed_rules,
     replace_rules,
     set_switch,
+    set_switches,
 )
 from vplan.interface import Device, DeviceGroup, SmartThingsId, SwitchState, Trigger
 
@@ -96,7 +96,7 @@ def fixture(filename: str) -> str:
 @pytest.fixture
 @patch("vplan.engine.smartthings._base_api_url", new_callable=BASE_URL)
 def test_context_dth(_):
-    with responses.RequestsMock(registry=OrderedRegistry) as r:
+    with responses.RequestsMock() as r:
         r.get(
             url="http://whatever/locations",
             body=fixture("locations.json"),
@@ -117,13 +117,15 @@ def test_context_dth(_):
             body=fixture("rules.json"),
             match=[TIMEOUT_MATCHER, HEADERS_MATCHER],
         )
-        return SmartThings(PAT_TOKEN, LOCATION)
+        context = SmartThings(PAT_TOKEN, LOCATION)
+        CONTEXT.get().rule_by_id  # pylint: disable=expression-not-assigned  # prime the lazy rules fetch while mocks are active
+        return context
 
 
 @pytest.fixture
 @patch("vplan.engine.smartthings._base_api_url", new_callable=BASE_URL)
 def test_context_edge(_):
-    with responses.RequestsMock(registry=OrderedRegistry) as r:
+    with responses.RequestsMock() as r:
         r.get(
             url="http://whatever/locations",
             body=fixture("locations.json"),
@@ -144,7 +146,9 @@ def test_context_edge(_):
             body=fixture("rules.json"),
             match=[TIMEOUT_MATCHER, HEADERS_MATCHER],
         )
-        return SmartThings(PAT_TOKEN, LOCATION)
+        context = SmartThings(PAT_TOKEN, LOCATION)
+        CONTEXT.get().rule_by_id  # pylint: disable=expression-not-assigned  # prime the lazy rules fetch while mocks are active
+        return context
 
 
 class TestUtil:
@@ -397,7 +401,7 @@ class TestContext:
         ],
     )
     def test_load_context(self, _, devices_file, devices_expected):
-        with responses.RequestsMock(registry=OrderedRegistry) as r:
+        with responses.RequestsMock() as r:
             r.get(
                 url="http://whatever/locations",
                 body=fixture("locations.json"),
@@ -441,7 +445,7 @@ class TestContext:
                 CONTEXT.get()  # the context should not be available outside the SmartThings() block above
 
     def test_load_context_location_error(self, _):
-        with responses.RequestsMock(registry=OrderedRegistry) as r:
+        with responses.RequestsMock() as r:
             r.get(
                 url="http://whatever/locations",
                 status=500,
@@ -452,7 +456,7 @@ class TestContext:
                     CONTEXT.get()
 
     def test_load_context_rooms_error(self, _):
-        with responses.RequestsMock(registry=OrderedRegistry) as r:
+        with responses.RequestsMock() as r:
             r.get(
                 url="http://whatever/locations",
                 body=fixture("locations.json"),
@@ -468,7 +472,7 @@ class TestContext:
                     CONTEXT.get()
 
     def test_load_context_devices_error(self, _):
-        with responses.RequestsMock(registry=OrderedRegistry) as r:
+        with responses.RequestsMock() as r:
             r.get(
                 url="http://whatever/locations",
                 body=fixture("locations.json"),
@@ -493,7 +497,7 @@ class TestContext:
                     CONTEXT.get()
 
     def test_load_context_rules_error(self, _):
-        with responses.RequestsMock(registry=OrderedRegistry) as r:
+        with responses.RequestsMock() as r:
             r.get(
                 url="http://whatever/locations",
                 body=fixture("locations.json"),
@@ -524,7 +528,7 @@ class TestContext:
             )
             with pytest.raises(SmartThingsClientError, match=r"500 Server Error"):
                 with SmartThings(pat_token=PAT_TOKEN, location=LOCATION):
-                    CONTEXT.get()
+                    CONTEXT.get().rule_by_id  # pylint: disable=expression-not-assigned
 
 
 class TestRules:
@@ -801,6 +805,42 @@ class TestClient:
                 with pytest.raises(SmartThingsClientError, match=r"500 Server Error"):
                     set_switch(Device(room="Office", device="Desk Lamp"), SwitchState.ON)
 
+    @pytest.mark.parametrize(
+        "state,command",
+        [(SwitchState.ON, "on"), (SwitchState.OFF, "off")],
+    )
+    def test_set_switches_dth(self, _, test_context_dth, state, command):
+        with test_context_dth:
+            with responses.RequestsMock() as r:
+                for did in ["54e6a736-xxxx-xxxx-xxxx-febc0cacd2cc", "e25f022a-xxxx-xxxx-xxxx-3385cb2ef6c0"]:
+                    r.post(
+                        url="http://whatever/devices/%s/commands" % did,
+                        status=200,
+                        match=[
+                            TIMEOUT_MATCHER,
+                            HEADERS_MATCHER,
+                            matchers.json_params_matcher(
+                                {"commands": [{"component": "main", "capability": "switch", "command": command}]}
+                            ),
+                        ],
+                    )
+                devices = [Device(room="Office", device="Desk Lamp"), Device(room="Living Room", device="China Cabinet")]
+                set_switches(devices, state)
+
+    def test_set_switches_dth_error(self, _, test_context_dth):
+        with test_context_dth:
+            with responses.RequestsMock() as r:
+                r.post(url="http://whatever/devices/54e6a736-xxxx-xxxx-xxxx-febc0cacd2cc/commands", status=500)
+                r.post(url="http://whatever/devices/e25f022a-xxxx-xxxx-xxxx-3385cb2ef6c0/commands", status=500)
+                devices = [Device(room="Office", device="Desk Lamp"), Device(room="Living Room", device="China Cabinet")]
+                with pytest.raises(SmartThingsClientError, match=r"500 Server Error"):
+                    set_switches(devices, SwitchState.ON)
+
+    def test_set_switches_empty(self, _, test_context_dth):
+        with test_context_dth:
+            with responses.RequestsMock():
+                set_switches([], SwitchState.ON)  # no requests are made for an empty group
+
     @pytest.mark.parametrize(
         "state,command",
         [(SwitchState.ON, "on"), (SwitchState.OFF, "off")],
@@ -432,6 +432,17 @@ class TestYamlParsing:
         assert schema.devices() == DEVICES_EXPECTED_V110
         assert schema.devices("first-floor-lights") == schema.plan.groups[0].devices
 
+    def test_devices_caching(self):
+        schema = parse_yaml_file_as(PlanSchema, VALID_PLAN_FILE_V110)
+        assert schema.devices() is schema.devices()  # results are memoized per instance
+        assert schema.devices("first-floor-lights") is schema.devices("first-floor-lights")
+        assert schema.devices("bogus") == []
+
+    def test_contains_device(self):
+        schema = parse_yaml_file_as(PlanSchema, VALID_PLAN_FILE_V110)
+        assert schema.contains_device(schema.plan.groups[0].devices[0]) is True
+        assert schema.contains_device(Device(room="bogus", device="bogus")) is False
+
     def test_parsing_invalid_minimum_version(self):
         with pytest.raises(ValueError, match=r"Invalid plan schema version"):
             parse_yaml_file_as(PlanSchema, INVALID_PLAN_FILE_MIN_VER)